@@ -3,7 +3,7 @@
 """
 chartroutes_srlinux.py
 Script to collect active/total route count for specified protocols from Nokia SR Linux routers
-via gNMIc and graph them in an Excel spreadsheet
+via a gNMIc subscription and graph them in an Excel spreadsheet
 
 Modernized version adapted from original Juniper PyEz chartroutes.py
 Author: Adapted for SR Linux - 2026
@@ -12,37 +12,74 @@ Original concept: M. McCoy 2017
 """
 
 import sys
-import json
-import subprocess
 import time
-from time import strftime
-from datetime import datetime
 import re
 import collections
-import select
+import itertools
 import argparse
 import os
+import asyncio
 import threading
-import queue
 import xlsxwriter
-from decimal import Decimal
+import ijson
+import numpy as np
 
-# Global flag to stop threads
-stop_threads = False
+# Map common family names to SR Linux's naming
+_FAMILY_MAP = {
+    'ipv4-unicast': 'srl_nokia-common:ipv4-unicast',
+    'ipv6-unicast': 'srl_nokia-common:ipv6-unicast',
+    'evpn': 'srl_nokia-common:evpn'
+}
 
-def execute_gnmic_command(target, username, password, path, timeout=10):
+# gNMI paths to subscribe to for each supported protocol, one set per address family
+_PROTOCOL_PATHS = {
+    'bgp': [
+        '/network-instance[name={network_instance}]/protocols/bgp/afi-safi[afi-safi-name={afi_safi_name}]/active-routes',
+        '/network-instance[name={network_instance}]/protocols/bgp/afi-safi[afi-safi-name={afi_safi_name}]/received-routes'
+    ]
+}
+
+# Route count leaves and the stat each one is recorded as
+_ROUTE_COUNT_LEAVES = {
+    'active-routes': 'active',
+    'received-routes': 'total'
+}
+
+_AFI_SAFI_NAME = re.compile(r'afi-safi-name=([^\]]+)')
+
+# Seconds to wait before reopening a subscription that dropped
+_RESUBSCRIBE_DELAY = 5
+
+def _toi(value):
+    """Convert a route counter to int; json_ietf sends counter64 values as strings, proto as numbers"""
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+async def start_gnmic_subscription(target, username, password, paths, sample_interval='1s', encoding='proto'):
     """
-    Execute a gNMIc get command and return the parsed JSON response
+    Start a long-lived gNMIc subscription that streams samples of a set of paths
+    
+    A single gNMI session is kept open for the whole collection instead of
+    running a separate 'gnmic get' (process start + TLS handshake) per sample,
+    and all paths share that one subscription.
+    
+    The paths are leaves, so the device can send them PROTO encoded (typed
+    scalar values) instead of serializing each sample to JSON; json_ietf
+    remains available for devices that do not support PROTO.
     
     Args:
         target: IP address or hostname of the SR Linux device
         username: SSH username
-        password: SSH password  
-        path: gNMI path to query
-        timeout: Command timeout in seconds
+        password: SSH password
+        paths: List of gNMI paths to subscribe to
+        sample_interval: How often the device sends a sample of the paths
+        encoding: gNMI encoding requested from the device ('proto' or 'json_ietf')
         
     Returns:
-        Parsed JSON response or None on error
+        asyncio.subprocess.Process handle for the running gnmic process
     """
     cmd = [
         'gnmic',
@@ -50,208 +87,145 @@ def execute_gnmic_command(target, username, password, path, timeout=10):
         '--skip-verify',
         '-u', username,
         '-p', password,
-        '--encoding', 'json_ietf',
-        'get',
-        '--path', path,
+        '--encoding', encoding,
+        'subscribe',
+        '--mode', 'stream',
+        '--stream-mode', 'sample',
+        '--sample-interval', sample_interval,
         '--format', 'json'
     ]
     
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        
-        if result.returncode != 0:
-            print(f"gNMIc command failed for {target}: {result.stderr}")
-            return None
-            
-        # Parse the JSON response
-        response = json.loads(result.stdout)
-        return response
-        
-    except subprocess.TimeoutExpired:
-        print(f"gNMIc command timed out for {target}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse gNMIc JSON response for {target}: {e}")
-        return None
-    except Exception as e:
-        print(f"Error executing gNMIc command for {target}: {e}")
-        return None
+    for path in paths:
+        cmd.extend(['--path', path])
+    
+    return await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
 
 
-def get_route_summary(target, username, password, network_instance='default', protocol='bgp'):
+async def get_protocol_stats_by_family(stream, wanted):
     """
-    Get route summary statistics from SR Linux
+    Get route statistics for specific address families from a gNMIc subscription
+    
+    The subscription is to the route count leaves of each wanted AFI-SAFI, so
+    every update carries a single value identified by its path. gNMIc output
+    is parsed event by event and only those values are kept.
     
     Args:
-        target: IP address or hostname
-        username: SSH username
-        password: SSH password
-        network_instance: Network instance name (default: 'default')
-        protocol: Routing protocol (bgp, isis, ospf, static, etc.)
+        stream: stdout of a gnmic subscribe process for the route count leaves
+        wanted: List of (family, SR Linux afi-safi-name) pairs, e.g. [('ipv4-unicast', 'srl_nokia-common:ipv4-unicast')]
         
-    Returns:
-        Dictionary with total and active route counts, or None on error
+    Yields:
+        (family, 'total' or 'active', route count) for each update of a wanted family,
+        and (None, 'sync-response', None) once the device has sent its initial values
     """
-    
-    if protocol.lower() == 'bgp':
-        # Query the entire BGP container to get afi-safi statistics
-        bgp_path = f'/network-instance[name={network_instance}]/protocols/bgp/afi-safi'
-        
-        stats = {'total': 0, 'active': 0}
-        
-        bgp_data = execute_gnmic_command(target, username, password, bgp_path)
-        if bgp_data:
-            try:
-                # Navigate the gNMI response structure
-                for item in bgp_data:
-                    if 'updates' in item:
-                        for update in item['updates']:
-                            if 'values' in update:
-                                values = update['values']
-                                
-                                # SR Linux returns the full path in the key
-                                for key, value in values.items():
-                                    if isinstance(value, list):
-                                        # afi-safi is a list
-                                        for afi_safi in value:
-                                            active = afi_safi.get('active-routes', 0)
-                                            received = afi_safi.get('received-routes', 0)
-                                            
-                                            # Convert string numbers to int
-                                            if isinstance(active, str):
-                                                active = int(active) if active.isdigit() else 0
-                                            if isinstance(received, str):
-                                                received = int(received) if received.isdigit() else 0
-                                            
-                                            stats['active'] += active
-                                            stats['total'] += received
-                                    
-                                    elif isinstance(value, dict):
-                                        # Sometimes nested differently
-                                        if 'afi-safi' in value:
-                                            for afi_safi in value['afi-safi']:
-                                                active = afi_safi.get('active-routes', 0)
-                                                received = afi_safi.get('received-routes', 0)
-                                                
-                                                if isinstance(active, str):
-                                                    active = int(active) if active.isdigit() else 0
-                                                if isinstance(received, str):
-                                                    received = int(received) if received.isdigit() else 0
-                                                
-                                                stats['active'] += active
-                                                stats['total'] += received
-                                
-            except Exception as e:
-                print(f"Error parsing BGP stats: {e}")
-                return None
-                
-        return stats
-        
-    else:
-        # For other protocols, implement similar logic
-        print(f"Protocol {protocol} not yet implemented")
-        return None
+    # The device may report afi-safi-name with or without its module prefix.
+    # Families naming the same AFI-SAFI all share its updates.
+    families_by_name = collections.defaultdict(list)
+    for family, sr_linux_name in wanted:
+        families_by_name[sr_linux_name.rpartition(':')[2]].append(family)
+    
+    message_prefix = ''
+    path = ''
+    
+    async for prefix, event, value in ijson.parse_async(stream, multiple_values=True):
+        if prefix == '' and event == 'start_map':
+            message_prefix = ''
+        elif prefix == 'sync-response' and value:
+            yield None, 'sync-response', None
+        elif prefix == 'prefix':
+            message_prefix = value
+        elif prefix == 'updates.item.Path':
+            path = value
+        elif prefix.startswith('updates.item.values.') and event in ('string', 'number'):
+            stat = _ROUTE_COUNT_LEAVES.get(path.rpartition('/')[2])
+            match = _AFI_SAFI_NAME.search(f'{message_prefix}/{path}')
+            if stat is None or match is None:
+                continue
+            
+            # Check if this is one of the families we're interested in
+            for requested_family in families_by_name.get(match.group(1).rpartition(':')[2], []):
+                yield requested_family, stat, _toi(value)
 
 
-def get_protocol_stats_by_family(target, username, password, network_instance, protocol, families):
+async def consume_subscription(target, username, password, paths, wanted, latest, synced, stop_event, debug=False,
+                               encoding='proto'):
     """
-    Get route statistics for specific address families
+    Coroutine to keep the latest route statistics from a device's subscription
+    
+    The device keeps one gNMI session for the whole collection. If the
+    session drops, it is reopened after a short pause instead of leaving the
+    device without data for the rest of the run.
     
     Args:
         target: Device IP/hostname
         username: Username
         password: Password
-        network_instance: Network instance name
-        protocol: Protocol name (bgp, isis, etc.)
-        families: List of address families (e.g., ['ipv4-unicast', 'ipv6-unicast'])
-        
-    Returns:
-        Dictionary with stats per family: {family: {'total': X, 'active': Y}}
+        paths: List of gNMI paths to subscribe to
+        wanted: List of (family, SR Linux afi-safi-name) pairs
+        latest: Dictionary updated in place with the latest stats per family, emptied while the subscription is down
+        synced: asyncio.Event set once latest holds the device's initial values, cleared while the subscription is down
+        stop_event: asyncio.Event set when collection should stop
+        debug: Enable debug output
+        encoding: gNMI encoding for the subscription
     """
-    results = {}
-    
-    # Map common family names to SR Linux's naming
-    family_map = {
-        'ipv4-unicast': 'srl_nokia-common:ipv4-unicast',
-        'ipv6-unicast': 'srl_nokia-common:ipv6-unicast',
-        'evpn': 'srl_nokia-common:evpn'
-    }
-    
-    if protocol.lower() == 'bgp':
-        # Query the BGP afi-safi container
-        path = f'/network-instance[name={network_instance}]/protocols/bgp/afi-safi'
+    while not stop_event.is_set():
+        try:
+            proc = await start_gnmic_subscription(target, username, password, paths, encoding=encoding)
+        except OSError as e:
+            print(f"Error starting gNMIc for {target}: {e}")
+            return
         
-        data = execute_gnmic_command(target, username, password, path)
+        # Drain stderr alongside the stream so a chatty gnmic can't block on a full pipe
+        stderr_task = asyncio.create_task(proc.stderr.read())
         
-        if data:
-            try:
-                for item in data:
-                    if 'updates' in item:
-                        for update in item['updates']:
-                            if 'values' in update:
-                                values = update['values']
-                                
-                                # Navigate the response
-                                for key, value in values.items():
-                                    afi_safi_list = []
-                                    
-                                    if isinstance(value, list):
-                                        afi_safi_list = value
-                                    elif isinstance(value, dict) and 'afi-safi' in value:
-                                        afi_safi_list = value['afi-safi']
-                                    
-                                    # Process each AFI-SAFI
-                                    for afi_safi in afi_safi_list:
-                                        afi_name = afi_safi.get('afi-safi-name', '')
-                                        
-                                        # Check if this is one of the families we're interested in
-                                        for requested_family in families:
-                                            sr_linux_name = family_map.get(requested_family, requested_family)
-                                            
-                                            if afi_name == sr_linux_name:
-                                                active = afi_safi.get('active-routes', 0)
-                                                received = afi_safi.get('received-routes', 0)
-                                                
-                                                # Convert strings to integers
-                                                if isinstance(active, str):
-                                                    active = int(active) if active.isdigit() else 0
-                                                if isinstance(received, str):
-                                                    received = int(received) if received.isdigit() else 0
-                                                
-                                                results[requested_family] = {
-                                                    'total': received,
-                                                    'active': active
-                                                }
-                
-                # Fill in zeros for families not found
-                for family in families:
-                    if family not in results:
-                        results[family] = {'total': 0, 'active': 0}
-                        
-            except Exception as e:
-                print(f"Error parsing AFI-SAFI stats: {e}")
-                for family in families:
-                    results[family] = {'total': 0, 'active': 0}
-        else:
-            for family in families:
-                results[family] = {'total': 0, 'active': 0}
-    else:
-        # Other protocols not implemented
-        for family in families:
-            results[family] = {'total': 0, 'active': 0}
-            
-    return results
+        try:
+            async for family, stat, count in get_protocol_stats_by_family(proc.stdout, wanted):
+                if family is None:
+                    # Anything not reported by now is absent on the device
+                    synced.set()
+                    continue
+                latest.setdefault(family, {})[stat] = count
+                if not synced.is_set() and all(len(latest.get(f, ())) == 2 for f, _ in wanted):
+                    synced.set()
+                if debug:
+                    print(f"[{target}] Update: {family} {stat} {count}")
+        except ijson.JSONError as e:
+            # Stopping the subscription can cut the last message short
+            if not stop_event.is_set():
+                print(f"Failed to parse gNMIc JSON response for {target}: {e}")
+        finally:
+            if proc.returncode is None:
+                proc.terminate()
+            await proc.wait()
+            if stop_event.is_set():
+                stderr_task.cancel()
+        
+        if stop_event.is_set():
+            break
+        
+        # The last counts are stale without a session; clearing them stops
+        # collect_route_data recording samples until the subscription has
+        # resynced, so the outage shows as a gap in the series
+        synced.clear()
+        latest.clear()
+        
+        # The stream only ends early if the subscription failed
+        stderr = await stderr_task
+        print(f"gNMIc subscription failed for {target}: {stderr.decode()}")
+        
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=_RESUBSCRIBE_DELAY)
+        except asyncio.TimeoutError:
+            pass
 
 
-def collect_route_data(target, username, password, network_instance, protocol, families, 
-                       duration, data_dict, device_queue, debug=False):
+async def collect_route_data(target, username, password, network_instance, protocol, families, 
+                             duration, data_dict, stop_event, debug=False, encoding='proto'):
     """
-    Thread function to collect route statistics from a device
+    Coroutine to collect route statistics from a device
     
     Args:
         target: Device IP/hostname
@@ -262,57 +236,140 @@ def collect_route_data(target, username, password, network_instance, protocol, f
         families: List of address families
         duration: How long to collect data (seconds)
         data_dict: Shared dictionary to store results
-        device_queue: Queue for thread status updates
+        stop_event: asyncio.Event set when collection should stop
         debug: Enable debug output
+        encoding: gNMI encoding for the subscription
     """
-    global stop_threads
-    
     start_time = time.time()
     
-    # Initialize data structure
+    # Preallocate one array per series, sized for one sample per second
+    max_samples = int(duration) + 2
+    series = [
+        (family, f"{family} {protocol.upper()} Total Routes", f"{family} {protocol.upper()} Active Routes")
+        for family in families
+    ]
+    
+    # Initialize data structure, starting with elapsed time tracking
+    route_stats = {'Elapsed Time': np.empty(max_samples, dtype=np.float64)}
+    for family, total_key, active_key in series:
+        route_stats[total_key] = np.empty(max_samples, dtype=np.int64)
+        route_stats[active_key] = np.empty(max_samples, dtype=np.int64)
+    
     data_dict[target] = {
-        'routeStats': collections.defaultdict(list)
+        'routeStats': route_stats,
+        'sampleCount': 0
     }
     
-    # Add elapsed time tracking
-    data_dict[target]['routeStats']['Elapsed Time'] = []
+    # Latest stats pushed by the subscription, sampled once per second below
+    latest = {}
+    synced = asyncio.Event()
+    reader = None
     
     try:
+        # Resolve the SR Linux family names and paths once for the whole collection
+        wanted = [(family, _FAMILY_MAP.get(family, family)) for family in families]
+        # Families resolving to the same AFI-SAFI share one set of paths
+        paths = list(dict.fromkeys(
+            path.format(network_instance=network_instance, afi_safi_name=sr_linux_name)
+            for family, sr_linux_name in wanted
+            for path in _PROTOCOL_PATHS.get(protocol.lower(), [])
+        ))
+        
+        if paths:
+            reader = asyncio.create_task(
+                consume_subscription(target, username, password, paths, wanted, latest, synced, stop_event, debug,
+                                     encoding)
+            )
+        else:
+            # Other protocols not implemented
+            print(f"Protocol {protocol} not yet implemented")
+        
         sample_count = 0
-        while not stop_threads and (time.time() - start_time) < duration:
+        tick = 0
+        while not stop_event.is_set() and time.time() < start_time + duration:
             current_time = time.time()
             elapsed = current_time - start_time
             
-            # Get stats for each address family
-            family_stats = get_protocol_stats_by_family(
-                target, username, password, network_instance, protocol, families
-            )
-            
-            if family_stats:
+            # Nothing to record until the device has sent its initial values,
+            # so families that arrive later are not recorded as zero
+            if synced.is_set():
+                if sample_count == max_samples:
+                    break
+                
                 # Record the elapsed time
-                data_dict[target]['routeStats']['Elapsed Time'].append(elapsed)
+                route_stats['Elapsed Time'][sample_count] = elapsed
                 
-                # Record stats for each family
-                for family, stats in family_stats.items():
-                    total_key = f"{family} {protocol.upper()} Total Routes"
-                    active_key = f"{family} {protocol.upper()} Active Routes"
-                    
-                    data_dict[target]['routeStats'][total_key].append(stats['total'])
-                    data_dict[target]['routeStats'][active_key].append(stats['active'])
+                # Record stats for each family, zero if the device has none
+                for family, total_key, active_key in series:
+                    stats = latest.get(family, {})
+                    route_stats[total_key][sample_count] = stats.get('total', 0)
+                    route_stats[active_key][sample_count] = stats.get('active', 0)
                 
                 sample_count += 1
+                data_dict[target]['sampleCount'] = sample_count
                 
                 if debug:
-                    print(f"[{target}] Sample {sample_count}: {family_stats}")
+                    print(f"[{target}] Sample {sample_count}: {latest}")
             
-            # Sleep for 1 second between samples (adjust as needed)
-            time.sleep(1)
-            
-        device_queue.put({target: 'Done'})
+            # Sleep until the next whole second after the start so sampling does
+            # not drift by the time spent recording, waking early on stop
+            tick += 1
+            remaining = start_time + tick - time.time()
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
         
     except Exception as e:
         print(f"Error collecting data from {target}: {e}")
-        device_queue.put({target: f'Error: {e}'})
+    finally:
+        # Cancelling the reader closes the device's subscription
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+
+
+def first_crossing(route_counts, threshold, inclusive):
+    """
+    Find the first sample whose route count passes a threshold
+    
+    Route counts normally only grow while converging, so the samples are
+    binary searched when they are sorted, with a linear scan as fallback.
+    
+    Args:
+        route_counts: NumPy array of route counts
+        threshold: Route count to look for
+        inclusive: Whether a count equal to the threshold passes it
+        
+    Returns:
+        Index of the first sample passing the threshold, or None if none does
+    """
+    if np.all(np.diff(route_counts) >= 0):
+        idx = int(np.searchsorted(route_counts, threshold, side='left' if inclusive else 'right'))
+    else:
+        passed = route_counts >= threshold if inclusive else route_counts > threshold
+        idx = int(passed.argmax()) if passed.any() else len(route_counts)
+    
+    return idx if idx < len(route_counts) else None
+
+
+def _fill_missing(values):
+    """
+    Return a column as an array with missing values (None or NaN) set to 0
+    
+    Collected route counts are integer arrays, so this only applies to data
+    from other sources.
+    """
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.where(values == None, 0, values)  # noqa: E711
+    elif values.dtype.kind == 'f':
+        values = np.where(np.isnan(values), 0, values)
+    return values
 
 
 def make_spreadsheet(sheetDataDict, excelFileName):
@@ -337,17 +394,19 @@ def make_spreadsheet(sheetDataDict, excelFileName):
     
     print(f"\nCreating file {excelFile} with the collected data")
     try:
-        workbook = xlsxwriter.Workbook(excelFile)
+        # constant_memory flushes each row once the next one is started, so
+        # every worksheet below is written strictly top to bottom
+        workbook = xlsxwriter.Workbook(excelFile, {'constant_memory': True})
     except Exception as err:
         print(f"Error creating Excel file: {err}")
         return False
     
+    # Define formatting, shared by every worksheet
+    timeFormat = workbook.add_format()
+    timeFormat.set_num_format('0.00')
+    sheetFormat = workbook.add_format({'num_format': 0})
+    
     for sheetData in sheetDataDict:
-        # Define formatting
-        timeFormat = workbook.add_format()
-        timeFormat.set_num_format('0.00')
-        sheetFormat = workbook.add_format({'num_format': 0})
-        
         # Define the title of the worksheet
         if 'sheetTitle' in sheetDataDict[sheetData]:
             if 'debug' in sheetDataDict[sheetData]:
@@ -356,41 +415,40 @@ def make_spreadsheet(sheetDataDict, excelFileName):
         else:
             ws = workbook.add_worksheet('Sheet1')
         
-        row, col = 0, 0
+        col = 0
         lastRow = 1
         timeCol = -1
+        headers = []
+        columns = []
         
         for dataItem in sheetDataDict[sheetData]['data']:
             if 'debug' in sheetDataDict[sheetData]:
                 print(f"  Processing Data Item {dataItem}")
                 print(f"  Length: {len(sheetDataDict[sheetData]['data'][dataItem])}")
             
-            # The first row contains the headers
-            ws.set_column(col, col, len(dataItem))
-            ws.write(row, col, dataItem)
-            row += 1
-            
-            for dataValue in range(len(sheetDataDict[sheetData]['data'][dataItem])):
-                # If no value exists, set it to 0
-                if not sheetDataDict[sheetData]['data'][dataItem][dataValue]:
-                    sheetDataDict[sheetData]['data'][dataItem][dataValue] = 0
-                
-                if 'Elapsed Time' in dataItem:
-                    wsVal = round(float(str(sheetDataDict[sheetData]['data'][dataItem][dataValue])), 2)
-                    ws.write(row, col, wsVal, timeFormat)
-                else:
-                    # Write numeric values
-                    wsVal = float(str(sheetDataDict[sheetData]['data'][dataItem][dataValue]))
-                    ws.write(row, col, wsVal, sheetFormat)
-                row += 1
-                lastRow = row
+            # If no value exists, set it to 0
+            values = _fill_missing(sheetDataDict[sheetData]['data'][dataItem])
             
+            # Format each column as a whole so rows can be written in one call
             if 'Elapsed Time' in dataItem:
+                ws.set_column(col, col, len(dataItem), timeFormat)
+                # Filled object arrays must be cast before rounding
+                columns.append(np.round(values.astype(float), 2).tolist())
                 timeCol = col
+            else:
+                ws.set_column(col, col, len(dataItem), sheetFormat)
+                columns.append(values.tolist())
             
-            row = 0
+            headers.append(dataItem)
+            lastRow = max(lastRow, len(values) + 1)
             col += 1
         
+        # The first row contains the headers, followed by one row per sample.
+        # Shorter columns are padded with blank cells so no data is dropped.
+        ws.write_row(0, 0, headers)
+        for row, rowValues in enumerate(itertools.zip_longest(*columns), start=1):
+            ws.write_row(row, 0, rowValues)
+        
         # Create the graph
         if 'graphTitle' in sheetDataDict[sheetData]:
             wsGraph = workbook.add_worksheet(sheetDataDict[sheetData]['graphTitle'])
@@ -420,9 +478,87 @@ def make_spreadsheet(sheetDataDict, excelFileName):
     return True
 
 
-def main():
-    global stop_threads
+def make_csv(sheetDataDict, csvFileName):
+    """
+    Create one CSV file per sheet from collected data
     
+    Args:
+        sheetDataDict: Dictionary of sheet data
+        csvFileName: Output filename prefix (the sheet name and .csv extension are appended)
+    """
+    
+    # Validate that there is data to work on
+    for sheetData in sheetDataDict:
+        if 'data' not in sheetDataDict[sheetData]:
+            raise Exception('make_csv() ERROR: No data available to create CSV file')
+    
+    for sheetData in sheetDataDict:
+        csvFile = f"{csvFileName}_{sheetData}.csv"
+        print(f"\nCreating file {csvFile} with the collected data")
+        
+        # Missing values are set to 0 as in the spreadsheet, keeping two
+        # decimals for elapsed time
+        headers = list(sheetDataDict[sheetData]['data'])
+        formats = ['%.2f' if 'Elapsed Time' in header else '%d' for header in headers]
+        columns = [
+            _fill_missing(values).astype(float if 'Elapsed Time' in header else np.int64).tolist()
+            for header, values in sheetDataDict[sheetData]['data'].items()
+        ]
+        
+        # Shorter columns are padded with empty fields so no data is dropped
+        with open(csvFile, 'w') as f:
+            f.write(','.join(headers) + '\n')
+            f.writelines(
+                ','.join('' if value is None else fmt % value for fmt, value in zip(formats, rowValues)) + '\n'
+                for rowValues in itertools.zip_longest(*columns)
+            )
+    
+    print("Done.")
+    return True
+
+
+async def run_collection(targets, args, families, rtrData, startTime):
+    """
+    Collect route statistics from all targets concurrently
+    
+    Args:
+        targets: List of device IPs/hostnames
+        args: Parsed command line arguments
+        families: List of address families
+        rtrData: Shared dictionary to store results
+        startTime: Time the collection started
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    
+    def stop_on_enter():
+        # An empty read means stdin is closed (e.g. running in the background),
+        # not that the user pressed ENTER
+        if not sys.stdin.readline():
+            return
+        try:
+            loop.call_soon_threadsafe(stop_event.set)
+        except RuntimeError:
+            # Collection already finished and the event loop is closed
+            return
+        elapsedTime = time.time() - startTime
+        print(f"Data collection stopped by user after {elapsedTime:.2f} seconds")
+    
+    # Wait for ENTER in a daemon thread blocked on stdin, so nothing polls
+    # stdin and the thread never holds up exit
+    stdin_reader = threading.Thread(target=stop_on_enter)
+    stdin_reader.daemon = True
+    stdin_reader.start()
+    
+    await asyncio.gather(*[
+        collect_route_data(target, args.username, args.password, args.network_instance,
+                           args.protocol, families, args.duration, rtrData, stop_event, args.debug,
+                           args.encoding)
+        for target in targets
+    ])
+
+
+def main():
     parser = argparse.ArgumentParser(
         description='Collect and graph route statistics from Nokia SR Linux routers'
     )
@@ -449,11 +585,18 @@ def main():
                        help='Comma-separated ending route values for convergence calculation (one per family)')
     parser.add_argument('-x', '--debug', action='store_true',
                        help='Enable debug output')
+    parser.add_argument('--no-chart', action='store_true',
+                       help='Only write the data sheets, without graphs')
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'both'], default='xlsx',
+                       help='Output file format: xlsx, one csv per device, or both (default: xlsx)')
+    parser.add_argument('--encoding', choices=['proto', 'json_ietf'], default='proto',
+                       help='gNMI encoding for the route count subscription (default: proto)')
     
     args = parser.parse_args()
     
     # Parse inputs
-    targets = [t.strip() for t in args.targets.split(',')]
+    # A target listed twice is only subscribed to once
+    targets = list(dict.fromkeys(t.strip() for t in args.targets.split(',')))
     families = [f.strip() for f in args.families.split(',')]
     
     starting_values = None
@@ -471,41 +614,15 @@ def main():
     print(f"Collection duration: {args.duration} seconds\n")
     
     startTime = time.time()
-    endTime = startTime + args.duration
     
     print(f"Starting data collection at {time.asctime(time.localtime(startTime))}")
     print("\nPress ENTER any time to stop data collection.\n")
     
     # Shared data structures
     rtrData = {}
-    device_queue = queue.Queue()
-    threads = []
-    stop_threads = False
-    
-    # Start collection thread for each target
-    for target in targets:
-        t = threading.Thread(
-            target=collect_route_data,
-            args=(target, args.username, args.password, args.network_instance,
-                  args.protocol, families, args.duration, rtrData, device_queue, args.debug)
-        )
-        threads.append(t)
-        t.daemon = True
-    
-    for t in threads:
-        t.start()
-    
-    # Wait for duration or user interrupt
-    while time.time() < (endTime + 5):
-        if select.select([sys.stdin], [], [], 0)[0]:
-            elapsedTime = time.time() - startTime
-            print(f"Data collection stopped by user after {elapsedTime:.2f} seconds")
-            break
     
-    # Stop threads
-    stop_threads = True
-    for t in threads:
-        t.join(timeout=10)
+    # Collect from every target on a single event loop
+    asyncio.run(run_collection(targets, args, families, rtrData, startTime))
     
     endTime = time.asctime(time.localtime(time.time()))
     print(f"Ending data collection at {endTime}\n")
@@ -513,7 +630,12 @@ def main():
     # Check for successful data collection
     valid_targets = []
     for target in targets:
-        if target in rtrData and len(rtrData[target]['routeStats']) > 1:
+        if target in rtrData and rtrData[target]['sampleCount'] > 0:
+            # Trim the preallocated arrays to the samples actually collected
+            sample_count = rtrData[target]['sampleCount']
+            rtrData[target]['routeStats'] = {
+                key: values[:sample_count] for key, values in rtrData[target]['routeStats'].items()
+            }
             valid_targets.append(target)
         else:
             print(f"WARNING: No data collected from {target}")
@@ -538,38 +660,27 @@ def main():
                 route_counts = rtrData[target]['routeStats'][total_key]
                 time_values = rtrData[target]['routeStats']['Elapsed Time']
                 
-                start_idx = None
-                end_idx = None
-                
                 # Determine if routes are increasing or decreasing
                 if starting_values[idx] < ending_values[idx]:
                     print(f"  {family}: Route count increasing from {starting_values[idx]} to {ending_values[idx]}")
                     
                     # Find start point
-                    for i, count in enumerate(route_counts):
-                        if count > starting_values[idx]:
-                            start_idx = max(0, i - 1)
-                            break
+                    start_idx = first_crossing(route_counts, starting_values[idx], inclusive=False)
+                    if start_idx is not None:
+                        start_idx = max(0, start_idx - 1)
                     
                     # Find end point
-                    for i, count in enumerate(route_counts):
-                        if count >= ending_values[idx]:
-                            end_idx = i
-                            break
+                    end_idx = first_crossing(route_counts, ending_values[idx], inclusive=True)
                 else:
                     print(f"  {family}: Route count decreasing from {starting_values[idx]} to {ending_values[idx]}")
                     
-                    # Find start point
-                    for i, count in enumerate(route_counts):
-                        if count < starting_values[idx]:
-                            start_idx = max(0, i - 1)
-                            break
+                    # Find start point, negating the counts so they increase
+                    start_idx = first_crossing(-route_counts, -starting_values[idx], inclusive=False)
+                    if start_idx is not None:
+                        start_idx = max(0, start_idx - 1)
                     
                     # Find end point
-                    for i, count in enumerate(route_counts):
-                        if count <= ending_values[idx]:
-                            end_idx = i
-                            break
+                    end_idx = first_crossing(-route_counts, -ending_values[idx], inclusive=True)
                 
                 if start_idx is not None and end_idx is not None:
                     start_time = time_values[start_idx]
@@ -589,7 +700,7 @@ def main():
                     if end_idx is None:
                         print(f"    ERROR: Could not find ending value {ending_values[idx]}")
     
-    # Create Excel output
+    # Create Excel and/or CSV output
     dir_path = os.path.dirname(os.path.realpath(__file__))
     chartDataLoc = os.path.join(dir_path, "data")
     if not os.path.exists(chartDataLoc):
@@ -597,7 +708,7 @@ def main():
         os.makedirs(chartDataLoc)
     
     sheetData = collections.defaultdict(dict)
-    excelFileName = os.path.join(chartDataLoc, f"{args.output}_{int(startTime)}")
+    outputFileName = os.path.join(chartDataLoc, f"{args.output}_{int(startTime)}")
     
     for target in valid_targets:
         sheetData[target] = {
@@ -607,6 +718,10 @@ def main():
             'format': 'general',
             'timeFormat': 'elapsed'
         }
+        
+        # make_spreadsheet only adds a graph for sheets with a graph title
+        if args.no_chart:
+            del sheetData[target]['graphTitle']
     
     if args.debug:
         print("\n!!! Debug enabled. Dumping collected data:")
@@ -615,9 +730,12 @@ def main():
         print(sheetData)
     
     try:
-        make_spreadsheet(sheetData, excelFileName)
+        if args.format in ('xlsx', 'both'):
+            make_spreadsheet(sheetData, outputFileName)
+        if args.format in ('csv', 'both'):
+            make_csv(sheetData, outputFileName)
     except Exception as err:
-        print(f"Error creating spreadsheet: {err}")
+        print(f"Error creating output files: {err}")
         sys.exit(1)
 
 
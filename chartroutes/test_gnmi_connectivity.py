@@ -8,18 +8,18 @@ Usage:
     python3 test_gnmi_connectivity.py -t <target> -u <username> -p <password>
 """
 
+import re
 import sys
 import json
+import functools
 import subprocess
 import argparse
 
+import orjson
 
-def test_connection(target, username, password):
-    """Test basic gNMI connectivity"""
-    print(f"\n{'='*60}")
-    print(f"Testing gNMI connectivity to {target}")
-    print(f"{'='*60}\n")
-    
+
+def run_gnmic(target, username, password, *command, timeout=10, text=True):
+    """Run a gnmic command against the target and return the completed process"""
     cmd = [
         'gnmic',
         '-a', f'{target}:57400',
@@ -27,11 +27,62 @@ def test_connection(target, username, password):
         '-u', username,
         '-p', password,
         '--encoding', 'json_ietf',
-        'capabilities'
+        *command
     ]
     
+    return subprocess.run(cmd, capture_output=True, text=text, timeout=timeout)
+
+
+def gnmic_get(target, username, password, *paths):
+    """Run a single gNMI Get for one or more paths and return the parsed JSON response"""
+    path_args = [arg for path in paths for arg in ('--path', path)]
+    # Keep stdout as bytes so orjson can parse it without a decode/encode round trip
+    result = run_gnmic(target, username, password, 'get', *path_args, '--format', 'json', text=False)
+    
+    if result.returncode != 0:
+        raise Exception(result.stderr.decode().strip())
+    
+    return orjson.loads(result.stdout)
+
+
+# Batched Get paths, matched with any YANG module prefixes on their elements
+_INSTANCE_NAME_PATH = re.compile(r'(?:^|/)(?:[\w-]+:)?network-instance(?:\[[^\]]*\])?/(?:[\w-]+:)?name$')
+_BGP_PATH = re.compile(r'(?:^|/)(?:[\w-]+:)?protocols/(?:[\w-]+:)?bgp(?:/|$)')
+
+
+def split_batched_get(data):
+    """
+    Route the updates of a batched instances+BGP Get by their path
+    
+    Returns (instance_data, bgp_data) in the same shape as a gnmic get
+    response, with None for a path that no update matched so the caller
+    can fall back to querying it on its own
+    """
+    instance_updates = []
+    bgp_updates = []
+    
+    for item in data:
+        prefix = item.get('prefix', '')
+        for update in item.get('updates', []):
+            path = f"{prefix}/{update.get('Path', '')}".strip('/')
+            if _BGP_PATH.search(path):
+                bgp_updates.append(update)
+            elif _INSTANCE_NAME_PATH.search(path):
+                instance_updates.append(update)
+    
+    instance_data = [{'updates': instance_updates}] if instance_updates else None
+    bgp_data = [{'updates': bgp_updates}] if bgp_updates else None
+    return instance_data, bgp_data
+
+
+def test_connection(target, username, password):
+    """Test basic gNMI connectivity"""
+    print(f"\n{'='*60}")
+    print(f"Testing gNMI connectivity to {target}")
+    print(f"{'='*60}\n")
+    
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        result = run_gnmic(target, username, password, 'capabilities')
         
         if result.returncode == 0:
             print("✓ Connection successful!")
@@ -51,121 +102,92 @@ def test_connection(target, username, password):
         return False
 
 
-def get_network_instances(target, username, password):
-    """List all network instances"""
+def get_network_instances(target, username, password, data=None):
+    """
+    List all network instances, using an already fetched response when given
+    
+    Returns (sorted list of names for display, set of names for membership tests)
+    """
     print(f"\n{'='*60}")
     print("Available Network Instances")
     print(f"{'='*60}\n")
     
-    # Try a broader query first
-    cmd = [
-        'gnmic',
-        '-a', f'{target}:57400',
-        '--skip-verify',
-        '-u', username,
-        '-p', password,
-        '--encoding', 'json_ietf',
-        'get',
-        '--path', '/network-instance/name',
-        '--format', 'json'
-    ]
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            instances = set()  # Use set to avoid duplicates
-            
-            for item in data:
-                if 'updates' in item:
-                    for update in item['updates']:
-                        if 'values' in update:
-                            # Extract network instance names from the path or values
-                            for key, value in update['values'].items():
-                                if key:  # Filter out empty strings
-                                    instances.add(key)
-                                # Sometimes the name is in the value
-                                if isinstance(value, dict) and 'name' in value:
-                                    instances.add(value['name'])
-            
-            instances = sorted(list(instances))  # Convert to sorted list
-            
-            if instances:
-                for ni in instances:
-                    print(f"  - {ni}")
-                return instances
-            else:
-                print("  Using default network instance")
-                return ['default']
-        else:
-            print(f"  Could not query network instances: {result.stderr}")
+    if data is None:
+        try:
+            data = gnmic_get(target, username, password, '/network-instance/name')
+        except Exception as e:
+            print(f"  Could not query network instances: {e}")
             print("  Using 'default' as fallback")
-            return ['default']
-            
-    except Exception as e:
-        print(f"  Error: {e}")
-        print("  Using 'default' as fallback")
-        return ['default']
+            return ['default'], {'default'}
+    
+    instances = set()  # Use set to avoid duplicates
+    
+    for item in data:
+        if 'updates' in item:
+            for update in item['updates']:
+                if 'values' in update:
+                    # Extract network instance names from the path or values
+                    for key, value in update['values'].items():
+                        if key:  # Filter out empty strings
+                            instances.add(key)
+                        # Sometimes the name is in the value
+                        if isinstance(value, dict) and 'name' in value:
+                            instances.add(value['name'])
+    
+    if instances:
+        instance_list = sorted(instances)
+        for ni in instance_list:
+            print(f"  - {ni}")
+        return instance_list, instances
+    else:
+        print("  Using default network instance")
+        return ['default'], {'default'}
 
 
-def get_bgp_neighbor_count(target, username, password, network_instance='default'):
-    """Get count of BGP neighbors"""
-    path = f'/network-instance[name={network_instance}]/protocols/bgp/neighbor'
+@functools.lru_cache(maxsize=64)
+def _fetch_bgp_container(target, username, password, network_instance):
+    """Get the BGP container once per (target, credentials, network instance) per run"""
+    return gnmic_get(target, username, password, f'/network-instance[name={network_instance}]/protocols/bgp')
+
+
+def _parse_bgp_container(data):
+    """Return (bgp_configured, values, neighbor_count) from a BGP container Get response"""
+    bgp_configured = False
+    values = {}
+    neighbor_count = 0
     
-    cmd = [
-        'gnmic',
-        '-a', f'{target}:57400',
-        '--skip-verify',
-        '-u', username,
-        '-p', password,
-        '--encoding', 'json_ietf',
-        'get',
-        '--path', path,
-        '--format', 'json'
-    ]
+    for item in data:
+        if 'updates' in item:
+            for update in item['updates']:
+                if 'values' in update and update['values']:
+                    bgp_configured = True
+                    values = update['values']
+                    
+                    # Try to count neighbors
+                    for key, value in values.items():
+                        if isinstance(value, dict):
+                            if 'protocols' in value and 'bgp' in value['protocols']:
+                                neighbors = value['protocols']['bgp'].get('neighbor', {})
+                                neighbor_count = len(neighbors)
+                            elif 'neighbor' in value:
+                                neighbor_count = len(value['neighbor'])
     
+    return bgp_configured, values, neighbor_count
+
+
+def get_bgp_neighbor_count(target, username, password, network_instance='default'):
+    """Get count of BGP neighbors"""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            neighbor_count = 0
-            
-            for item in data:
-                if 'updates' in item:
-                    for update in item['updates']:
-                        if 'values' in update:
-                            values = update['values']
-                            
-                            # SR Linux returns the full path structure
-                            # Look for 'network-instance' key or nested structure
-                            for key, value in values.items():
-                                if isinstance(value, dict):
-                                    # Check if this is the network-instance level
-                                    if 'protocols' in value:
-                                        if 'bgp' in value['protocols']:
-                                            neighbors = value['protocols']['bgp'].get('neighbor', {})
-                                            neighbor_count = len(neighbors)
-                                    # Or check nested structure
-                                    elif 'network-instance' in value:
-                                        for ni_name, ni_data in value['network-instance'].items():
-                                            if ni_name == network_instance and isinstance(ni_data, dict):
-                                                if 'protocols' in ni_data and 'bgp' in ni_data['protocols']:
-                                                    neighbors = ni_data['protocols']['bgp'].get('neighbor', {})
-                                                    neighbor_count = len(neighbors)
-            
-            return neighbor_count
-        else:
-            # If the query fails, BGP might not be configured
-            return 0
-            
+        _, _, neighbor_count = _parse_bgp_container(
+            _fetch_bgp_container(target, username, password, network_instance))
+        return neighbor_count
     except Exception:
+        # If the query fails, BGP might not be configured
         return 0
 
 
-def get_bgp_statistics(target, username, password, network_instance='default', debug=False):
-    """Get BGP statistics for a network instance"""
+def get_bgp_statistics(target, username, password, network_instance='default', debug=False, data=None):
+    """Get BGP statistics for a network instance, using an already fetched response when given"""
     print(f"\n{'='*60}")
     print(f"BGP Information for network-instance: {network_instance}")
     print(f"{'='*60}\n")
@@ -173,54 +195,24 @@ def get_bgp_statistics(target, username, password, network_instance='default', d
     # First check if BGP is configured by trying to query the BGP container
     bgp_path = f'/network-instance[name={network_instance}]/protocols/bgp'
     
-    cmd = [
-        'gnmic',
-        '-a', f'{target}:57400',
-        '--skip-verify',
-        '-u', username,
-        '-p', password,
-        '--encoding', 'json_ietf',
-        'get',
-        '--path', bgp_path,
-        '--format', 'json'
-    ]
-    
     bgp_configured = False
+    values = {}
     neighbor_count = 0
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        if data is None:
+            data = _fetch_bgp_container(target, username, password, network_instance)
         
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            if debug:
-                print("DEBUG: BGP query response:")
-                print(json.dumps(data, indent=2))
-            
-            # Parse the response to check for BGP configuration
-            for item in data:
-                if 'updates' in item:
-                    for update in item['updates']:
-                        if 'values' in update and update['values']:
-                            bgp_configured = True
-                            values = update['values']
-                            
-                            # Try to count neighbors
-                            for key, value in values.items():
-                                if isinstance(value, dict):
-                                    if 'protocols' in value and 'bgp' in value['protocols']:
-                                        neighbors = value['protocols']['bgp'].get('neighbor', {})
-                                        neighbor_count = len(neighbors)
-                                    elif 'neighbor' in value:
-                                        neighbor_count = len(value['neighbor'])
-        else:
-            if debug:
-                print(f"DEBUG: BGP query failed: {result.stderr}")
+        if debug:
+            print("DEBUG: BGP query response:")
+            print(json.dumps(data, indent=2))
+        
+        # Parse the response to check for BGP configuration
+        bgp_configured, values, neighbor_count = _parse_bgp_container(data)
                 
     except Exception as e:
         if debug:
-            print(f"DEBUG: Exception during BGP query: {e}")
+            print(f"DEBUG: BGP query failed: {e}")
     
     if not bgp_configured:
         print("  ℹ BGP is not configured in this network instance")
@@ -314,11 +306,10 @@ def show_example_paths(target, username, password):
         print(f"{desc}:")
         print(f"  {base_cmd} get --path '{path}' --format json\n")
     
-    print("For route counting in chartroutes, the tool will query:")
-    print(f"  {base_cmd} get \\")
-    print("    --path '/network-instance[name=default]/protocols/bgp/statistics/ipv4-unicast' --format json")
-    print(f"  {base_cmd} get \\")
-    print("    --path '/network-instance[name=default]/protocols/bgp/statistics/ipv6-unicast' --format json")
+    print("For route counting in chartroutes, the tool will subscribe to (per address family):")
+    print(f"  {base_cmd.replace('json_ietf', 'proto')} subscribe --mode stream --stream-mode sample --sample-interval 1s \\")
+    print("    --path '/network-instance[name=default]/protocols/bgp/afi-safi[afi-safi-name=srl_nokia-common:ipv4-unicast]/active-routes' \\")
+    print("    --path '/network-instance[name=default]/protocols/bgp/afi-safi[afi-safi-name=srl_nokia-common:ipv4-unicast]/received-routes' --format json")
 
 
 def main():
@@ -359,12 +350,22 @@ def main():
         print("  commit now")
         sys.exit(1)
     
+    # Fetch network instances and BGP state in one Get and route each update
+    # by its path. If the batch fails (e.g. BGP not configured) or a path got
+    # no updates, that function falls back to its own query.
+    bgp_path = f'/network-instance[name={args.network_instance}]/protocols/bgp'
+    try:
+        data = gnmic_get(args.target, args.username, args.password, '/network-instance/name', bgp_path)
+        instance_data, bgp_data = split_batched_get(data)
+    except Exception:
+        instance_data = bgp_data = None
+    
     # Get network instances
-    instances = get_network_instances(args.target, args.username, args.password)
+    instances, instance_set = get_network_instances(args.target, args.username, args.password, instance_data)
     
     # Get BGP statistics
-    if args.network_instance in instances or args.network_instance == 'default':
-        get_bgp_statistics(args.target, args.username, args.password, args.network_instance, args.debug)
+    if args.network_instance in instance_set or args.network_instance == 'default':
+        get_bgp_statistics(args.target, args.username, args.password, args.network_instance, args.debug, bgp_data)
     else:
         print(f"\n⚠ Network instance '{args.network_instance}' not found")
         if instances:
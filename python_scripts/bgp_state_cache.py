@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# 10.15.26 Keep BGP neighbor state current from gnmic on-change subscriptions
+
+import re
+import subprocess
+import threading
+import time
+
+import orjson
+
+# Leaves reported per neighbor. Subscribing to leaves (not the whole neighbor
+# container) keeps every update a single scalar value.
+NEIGHBOR_LEAVES = ('session-state', 'peer-group', 'peer-type')
+
+_NI_NAME = re.compile(r'network-instance\[name=([^\]]+)\]')
+_PEER_ADDRESS = re.compile(r'neighbor\[peer-address=([^\]]+)\]')
+
+# Seconds to wait before reopening a subscription that ended
+_RESUBSCRIBE_DELAY = 5
+
+class BGPStateCache:
+    """Holds the latest BGP neighbor state for a set of routers.
+
+    One gnmic subscribe process per router runs in a background thread and
+    applies on-change updates to an in-memory dict, so readers get the current
+    state from get_snapshot() without querying the routers again.
+    """
+
+    def __init__(self, routers, user, pwd, port, ni_filter='*'):
+        self.routers = routers
+        self.user = user
+        self.pwd = pwd
+        self.port = port
+        self.ni_filter = ni_filter
+        self._state = {router: {} for router in routers}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._synced = {router: threading.Event() for router in routers}
+        self._procs = {}
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Starts one subscription thread per router."""
+        for router in self.routers:
+            thread = threading.Thread(target=self._subscribe, args=(router,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wait_synced(self, timeout=None):
+        """Blocks until every router has sent its initial state (or failed), up to timeout seconds in total."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for event in self._synced.values():
+            event.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def stop(self):
+        """Terminates the gnmic processes."""
+        self._stopping.set()
+        with self._lock:
+            procs = list(self._procs.values())
+        for proc in procs:
+            proc.terminate()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def get_snapshot(self):
+        """Returns {router: {ni_name: [neighbor dicts]}}, or the Exception for a router that failed."""
+        with self._lock:
+            snapshot = {}
+            for router in self.routers:
+                if router in self._errors and not self._state[router]:
+                    snapshot[router] = self._errors[router]
+                    continue
+                snapshot[router] = {
+                    ni_name: [dict(neighbor) for neighbor in peers.values()]
+                    for ni_name, peers in self._state[router].items()
+                }
+            return snapshot
+
+    def _subscribe(self, router):
+        base = f"/network-instance[name={self.ni_filter}]/protocols/bgp/neighbor[peer-address=*]"
+        cmd = [
+            "gnmic", "-a", f"{router}:{self.port}",
+            "-u", self.user, "-p", self.pwd,
+            "--skip-verify",
+            "-e", "json_ietf",
+            "subscribe",
+            "--mode", "stream",
+            "--stream-mode", "on-change",
+            "--format", "json"
+        ]
+        for leaf in NEIGHBOR_LEAVES:
+            cmd.extend(["--path", f"{base}/{leaf}"])
+
+        # Reopen the subscription whenever it ends, e.g. after a router reboot,
+        # until stop() is called
+        while not self._stopping.is_set():
+            try:
+                error = self._run_subscription(router, cmd)
+            except Exception as e:
+                error = e
+
+            if self._stopping.is_set():
+                break
+
+            # The router's cached state is no longer current; report it as failed until it resyncs
+            with self._lock:
+                self._state[router] = {}
+                self._errors[router] = error
+            self._synced[router].set()
+            self._stopping.wait(_RESUBSCRIBE_DELAY)
+
+    def _run_subscription(self, router, cmd):
+        """Applies updates from one gnmic process until it exits; returns the Exception describing why."""
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        with self._lock:
+            self._procs[router] = proc
+        if self._stopping.is_set():
+            proc.terminate()
+
+        # Drain stderr alongside stdout so a chatty gnmic can't block on a full pipe
+        stderr = []
+        stderr_reader = threading.Thread(target=lambda: stderr.extend(proc.stderr), daemon=True)
+        stderr_reader.start()
+
+        try:
+            # gnmic prints each message as indented JSON that closes with a
+            # "}" in column 0, so buffer lines until a message is complete.
+            buffer = []
+            for line in proc.stdout:
+                buffer.append(line)
+                if line.startswith('}') or (len(buffer) == 1 and line.rstrip().endswith('}')):
+                    self._apply(router, orjson.loads(''.join(buffer)))
+                    buffer = []
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+            stderr_reader.join(timeout=5)
+
+        # The last line gnmic wrote is the error; earlier output is only logging
+        lines = [line.strip() for line in stderr if line.strip()]
+        return Exception(lines[-1] if lines else f"gnmic subscription ended (exit code {proc.returncode})")
+
+    def _apply(self, router, message):
+        if message.get('sync-response'):
+            with self._lock:
+                self._errors.pop(router, None)
+            self._synced[router].set()
+            return
+
+        prefix = message.get('prefix', '')
+        with self._lock:
+            instances = self._state[router]
+            for update in message.get('updates', []):
+                path = f"{prefix}/{update.get('Path', '')}"
+                ni_match = _NI_NAME.search(path)
+                peer_match = _PEER_ADDRESS.search(path)
+                if not ni_match or not peer_match:
+                    continue
+                peer = peer_match.group(1)
+                neighbor = instances.setdefault(ni_match.group(1), {}).setdefault(peer, {'peer-address': peer})
+                for key, value in update.get('values', {}).items():
+                    neighbor[key.rsplit('/', 1)[-1].split(':')[-1]] = value
+
+            for path in message.get('deletes', []):
+                path = f"{prefix}/{path}"
+                ni_match = _NI_NAME.search(path)
+                peer_match = _PEER_ADDRESS.search(path)
+                if ni_match and peer_match:
+                    instances.get(ni_match.group(1), {}).pop(peer_match.group(1), None)
@@ -3,11 +3,25 @@
 # 01.22.26 Updated to discover SRLinux devices in Containerlab dynamically
 # 01.28.26 Added ANSI color coding for BGP states and refined logic
 # 01.28.26 REWRITE: Replaced pygnmi with gnmic subprocess for stability
+# 10.15.26 Query all routers concurrently with asyncio instead of one after another
+# 10.15.26 Added --watch mode backed by on-change subscriptions (bgp_state_cache.py)
+# 10.15.26 Reuse the discovered device list for 5 minutes (device_cache.py)
+# 10.15.26 Stream-parse gnmic output with ijson instead of loading it whole
+# 10.15.26 Buffer each router's report and write all routers at once
 
 import argparse
-import json
-import subprocess
+import asyncio
+import io
+import re
 import sys
+import time
+from operator import itemgetter
+
+import ijson
+import orjson
+
+from bgp_state_cache import BGPStateCache
+from device_cache import load_devices, save_devices
 
 # ANSI Color Codes
 GREEN = "\033[92m"
@@ -15,14 +29,34 @@ RED = "\033[91m"
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
-def discover_devices():
+# Neighbor fields shown in the report, with the value used when a leaf is missing
+NEIGHBOR_KEYS = ('peer-address', 'session-state', 'peer-group', 'peer-type')
+NEIGHBOR_FIELDS = itemgetter(*NEIGHBOR_KEYS)
+NEIGHBOR_DEFAULTS = dict.fromkeys(NEIGHBOR_KEYS, 'N/A')
+
+# Neighbor report lines, with the state color baked in
+TEMPLATE_UP = f"  Instance: {{ni:<12}} | Peer: {{peer:<15}} | Group: {{grp:<15}} | Type: {{t:<10}} | State: {GREEN}{{s}}{RESET}"
+TEMPLATE_DOWN = f"  Instance: {{ni:<12}} | Peer: {{peer:<15}} | Group: {{grp:<15}} | Type: {{t:<10}} | State: {RED}{{s}}{RESET}"
+
+# ijson prefixes inside a gnmic get response; keys match on their name with any module prefix stripped
+_NI_PREFIX = re.compile(r'item\.updates\.item\.values\.\.(?:[^.:]+:)?network-instance(?:\.item)?')
+_BGP_SUFFIX = re.compile(r'\.protocols\.(?:[^.:]+:)?bgp')
+_NEIGHBOR_SUFFIX = re.compile(r'\.protocols\.(?:[^.:]+:)?bgp\.neighbor\.item')
+
+async def discover_devices():
     """Discover SR Linux devices based on the specific JSON structure provided."""
+    devices = load_devices()
+    if devices:
+        return devices
+
     try:
-        cmd = ["containerlab", "inspect", "--format", "json"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        data = json.loads(result.stdout)
+        proc = await asyncio.create_subprocess_exec(
+            "containerlab", "inspect", "--format", "json",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await proc.communicate()
+        data = orjson.loads(stdout)
         
-        devices = []
         # Support both old and new clab JSON formats
         nodes_list = data if isinstance(data, list) else data.get('lab_nodes', [])
         if not nodes_list and isinstance(data, dict):
@@ -30,15 +64,15 @@ def discover_devices():
                 if isinstance(val, list):
                     nodes_list.extend(val)
 
-        for node in nodes_list:
-            if node.get('kind') == 'nokia_srlinux':
-                devices.append(node['name'])
+        devices = [node['name'] for node in nodes_list if node.get('kind') == 'nokia_srlinux']
+        if devices:
+            save_devices(devices)
         return devices
     except Exception as e:
         print(f"Error parsing containerlab output: {e}")
         return []
 
-def get_bgp_data_via_gnmic(router, user, pwd, port, ni_filter):
+async def get_bgp_data_via_gnmic(router, user, pwd, port, ni_filter):
     """Fetches BGP neighbor data using gnmic CLI."""
     # Construct the path based on filter
     path = f"/network-instance[name={ni_filter}]/protocols/bgp/neighbor"
@@ -53,94 +87,127 @@ def get_bgp_data_via_gnmic(router, user, pwd, port, ni_filter):
         "--format", "json"  # <--- Use "json" here for the Python script to parse easily
     ]
     
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    # Parse while gnmic is still writing, reading stderr alongside so neither
+    # pipe can fill up and block it. A failed get leaves stdout empty, so any
+    # parse error only matters if gnmic itself succeeded.
+    stderr_task = asyncio.create_task(proc.stderr.read())
+    parse_error = None
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        if "NotFound" in e.stderr:
+        instances = await neighbors_by_instance(proc.stdout)
+    except ijson.JSONError as e:
+        instances, parse_error = {}, e
+        # Drain the rest of the response so gnmic can finish writing and exit
+        await proc.stdout.read()
+    stderr = (await stderr_task).decode()
+    await proc.wait()
+
+    if proc.returncode != 0:
+        if "NotFound" in stderr:
             return {}
-        raise Exception(e.stderr.strip())
+        raise Exception(stderr.strip())
+    if parse_error:
+        raise parse_error
+    return instances
 
-def main():
-    # 1. CLI Setup
-    parser = argparse.ArgumentParser(description='Obtain BGP peer state via gnmic.')
-    parser.add_argument('-ni', type=str, default='*', 
-                        help='Specific network-instance name (e.g., "default"). Use "*" for all.')
-    parser.add_argument('-p', type=str, default='NokiaSrl1!', help='SRLinux password')
-    parser.add_argument('-u', type=str, default='admin', help='SRLinux username')
-    parser.add_argument('--port', type=int, default=57401, help='gNMI port')
+async def get_bgp_data_for_all(routers, user, pwd, port, ni_filter):
+    """Fetches BGP neighbor data from all routers at once, in router order."""
+    tasks = [get_bgp_data_via_gnmic(router, user, pwd, port, ni_filter) for router in routers]
+    return await asyncio.gather(*tasks, return_exceptions=True)
 
-    args = parser.parse_args()
+async def neighbors_by_instance(stream):
+    """Stream-parses a gnmic get response into {ni_name: [neighbor dicts]}.
 
-    print(f"{BOLD}Discovering SRLinux Devices in Containerlab...{RESET}")
-    routers = discover_devices()
-    if not routers:
-        print(f"{RED}No SRLinux devices found. Exiting.{RESET}")
-        exit(1)
-    print(f'{BOLD}Found {len(routers)} SRLinux Devices{RESET}')
+    Only the NEIGHBOR_KEYS leaves of each neighbor are kept, so memory use
+    follows the number of peers rather than the size of the response.
+    """
+    instances = {}
+    ni_name, neighbors, neighbor = 'unknown', None, None
+
+    async for prefix, event, value in ijson.parse_async(stream):
+        # Values sit under the empty-string key, then the prefixed network-instance key
+        match = _NI_PREFIX.match(prefix)
+        if not match:
+            continue
+        rest = prefix[match.end():]
 
+        if rest == '':
+            if event == 'start_map':
+                ni_name, neighbors = 'unknown', None
+            elif event == 'end_map' and neighbors is not None:
+                instances[ni_name] = neighbors
+        elif rest == '.name':
+            ni_name = value
+        elif _BGP_SUFFIX.fullmatch(rest):
+            if event == 'start_map':
+                neighbors = []
+        elif _NEIGHBOR_SUFFIX.fullmatch(rest):
+            if event == 'start_map':
+                neighbor = {}
+            elif event == 'end_map':
+                neighbors.append(neighbor)
+        elif neighbor is not None and _NEIGHBOR_SUFFIX.fullmatch(rest.rpartition('.')[0]):
+            key = rest.rpartition('.')[2]
+            if key in NEIGHBOR_KEYS:
+                neighbor[key] = value
+    return instances
+
+def process_router(router, instances, ni_filter):
+    """Formats one router's neighbor tables; returns (report text, peers, established peers).
+
+    instances is {ni_name: [neighbor dicts]} or the Exception raised while querying the router.
+    """
+    out = io.StringIO()
     total_peers = 0
-    total_est_peers = 0 
+    total_est_peers = 0
 
-    for router in routers:
-        print(f"\n{'*' * 60}\nRouter: {BOLD}{router}{RESET} (Filter: {args.ni})\n{'*' * 60}")
+    out.write(f"\n{'*' * 60}\nRouter: {BOLD}{router}{RESET} (Filter: {ni_filter})\n{'*' * 60}\n")
 
-        try:
-            raw_data = get_bgp_data_via_gnmic(router, args.u, args.p, args.port, args.ni)
+    try:
+        if isinstance(instances, Exception):
+            raise instances
+
+        for ni_name, neighbors in instances.items():
+            # Pull the four fields out of every neighbor in one pass, then count on the lists
+            rows = [NEIGHBOR_FIELDS({**NEIGHBOR_DEFAULTS, **n}) for n in neighbors]
+            states = [row[1].lower() for row in rows]
+            peer_count = len(rows)
+            estab_count = states.count('established')
+            total_peers += peer_count
+            total_est_peers += estab_count
 
-            # 1. Access the first message in the list
-            if not raw_data or not isinstance(raw_data, list):
-                continue
+            for (peer, state, group, peer_type), state_lower in zip(rows, states):
+                template = TEMPLATE_UP if state_lower == 'established' else TEMPLATE_DOWN
+                out.write(template.format(ni=ni_name, peer=peer, grp=group, t=peer_type, s=state))
+                out.write("\n")
             
-            updates = raw_data[0].get('updates', [])
-            for update in updates:
-                # 2. Access the values, then the empty string key ""
-                values_container = update.get('values', {}).get('', {})
-                
-                # 3. Find the network-instance key (ignoring prefixes)
-                ni_key = next((k for k in values_container.keys() if 'network-instance' in k), None)
-                if not ni_key: continue
-                
-                ni_list = values_container[ni_key]
-                if not isinstance(ni_list, list): ni_list = [ni_list]
-
-                for ni in ni_list:
-                    ni_name = ni.get('name', 'unknown')
-                    # 4. Dig into protocols -> bgp -> neighbor
-                    protocols = ni.get('protocols', {})
-                    bgp_key = next((k for k in protocols.keys() if 'bgp' in k), None)
-                    if not bgp_key: continue
-                    
-                    bgp_data = protocols[bgp_key]
-                    neighbors = bgp_data.get('neighbor', [])
-                    
-                    peer_count = 0
-                    estab_count = 0
-                    
-                    for n in neighbors:
-                        peer = n.get('peer-address', 'N/A')
-                        state = n.get('session-state', 'N/A')
-                        group = n.get('peer-group', 'N/A')
-                        peer_type = n.get('peer-type', 'N/A')
-                        
-                        peer_count += 1
-                        total_peers += 1
-
-                        if state.lower() == 'established':
-                            color = GREEN
-                            estab_count += 1
-                            total_est_peers += 1
-                        else:
-                            color = RED
-
-                        print(f"  Instance: {ni_name:<12} | Peer: {peer:<15} | Group: {group:<15} | Type: {peer_type:<10} | State: {color}{state}{RESET}")
-                    
-                    if peer_count > 0:
-                        print(f"  {'-' * 105}")
-                        print(f"  Instance Summary: {ni_name:<12} | Total: {peer_count} | Up: {GREEN}{estab_count}{RESET}")
-
-        except Exception as e:
-            print(f"{RED}Error on {router}: {e}{RESET}")
+            if peer_count > 0:
+                out.write(f"  {'-' * 105}\n")
+                out.write(f"  Instance Summary: {ni_name:<12} | Total: {peer_count} | Up: {GREEN}{estab_count}{RESET}\n")
+
+    except Exception as e:
+        out.write(f"{RED}Error on {router}: {e}{RESET}\n")
+
+    return out.getvalue(), total_peers, total_est_peers
+
+def print_report(routers, results, ni_filter):
+    """Prints per-router neighbor tables and the fabric summary.
+
+    results maps each router to {ni_name: [neighbor dicts]} or to the Exception raised for it.
+    """
+    total_peers = 0
+    total_est_peers = 0 
+
+    # Format every router into its own buffer, then emit them in router order with one write
+    texts = []
+    for router in routers:
+        text, peers, est_peers = process_router(router, results[router], ni_filter)
+        texts.append(text)
+        total_peers += peers
+        total_est_peers += est_peers
+    sys.stdout.write("".join(texts))
 
     # Final Fabric Summary
     print(f"\n{BOLD}{'='*60}{RESET}")
@@ -157,5 +224,54 @@ def main():
         print(f"Total Peers Down:            {GREEN}0 (All Established!){RESET}")
     print(f"{BOLD}{'='*60}{RESET}\n")
 
+def watch(routers, args):
+    """Reprints the report from on-change subscriptions until interrupted."""
+    cache = BGPStateCache(routers, args.u, args.p, args.port, args.ni)
+    cache.start()
+    cache.wait_synced(timeout=30)
+    try:
+        while True:
+            print_report(routers, cache.get_snapshot(), args.ni)
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.stop()
+
+async def discover_and_query(args):
+    """Discovers routers and, unless watching, queries them, all on one event loop."""
+    print(f"{BOLD}Discovering SRLinux Devices in Containerlab...{RESET}")
+    routers = await discover_devices()
+    if not routers:
+        print(f"{RED}No SRLinux devices found. Exiting.{RESET}")
+        exit(1)
+    print(f'{BOLD}Found {len(routers)} SRLinux Devices{RESET}')
+
+    if args.watch:
+        return routers, None
+    # Query every router concurrently, then report them in discovery order
+    return routers, await get_bgp_data_for_all(routers, args.u, args.p, args.port, args.ni)
+
+def main():
+    # 1. CLI Setup
+    parser = argparse.ArgumentParser(description='Obtain BGP peer state via gnmic.')
+    parser.add_argument('-ni', type=str, default='*', 
+                        help='Specific network-instance name (e.g., "default"). Use "*" for all.')
+    parser.add_argument('-p', type=str, default='NokiaSrl1!', help='SRLinux password')
+    parser.add_argument('-u', type=str, default='admin', help='SRLinux username')
+    parser.add_argument('--port', type=int, default=57401, help='gNMI port')
+    parser.add_argument('--watch', type=int, metavar='SECONDS',
+                        help='Keep on-change subscriptions open and reprint the report every SECONDS')
+
+    args = parser.parse_args()
+
+    routers, raw_results = asyncio.run(discover_and_query(args))
+    if args.watch:
+        watch(routers, args)
+        return
+
+    results = dict(zip(routers, raw_results))
+    print_report(routers, results, args.ni)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,42 +2,199 @@
 # 01.21.26 M. McCoy Script to report the BGP neighbors in network-instances
 # 01.22.26 Updated to discover SRLinux devices in Containerlab dynamically
 # 01.28.26 Added ANSI color coding for BGP states and refined logic
+# 10.15.26 Reuse gNMI sessions through a small connection pool
+# 10.15.26 Reuse the discovered device list for 5 minutes (device_cache.py)
+# 10.15.26 Query routers from a thread pool, buffering each router's output
+# 10.15.26 Identify pooled gNMI sessions with a user agent
 
 import argparse
+import io
 import json
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pygnmi.client import gNMIclient
 
+from device_cache import load_devices, save_devices
+
 # ANSI Color Codes
 GREEN = "\033[92m"
 RED = "\033[91m"
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
+# Channel options for pooled sessions. No keepalive pings: the gNMI server
+# (grpc-go defaults) rejects pings closer than 5 minutes apart or outside a
+# call, and each Get is a single short call. Stale sessions are instead
+# bounded by GNMIPool's idle_timeout and max_age.
+GRPC_OPTIONS = [
+    ('grpc.primary_user_agent', 'clab_automation/1.0'),
+]
+
+class GNMIPool:
+    """Keeps connected gNMIclient sessions so repeat queries skip the TLS/auth handshake.
+
+    Entries are keyed by (host, port, username, password) and evicted lazily on
+    get() once idle longer than idle_timeout or older than max_age seconds.
+    """
+
+    def __init__(self, idle_timeout=300, max_age=3600, timeout=10):
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.timeout = timeout
+        self._clients = {}
+        self._lock = threading.RLock()
+
+    def get(self, host, port, username, password):
+        key = (host, port, username, password)
+        with self._lock:
+            self._evict_expired()
+            entry = self._clients.get(key)
+            if entry is not None:
+                entry['last_used'] = time.monotonic()
+                return entry['client']
+
+        # Connect outside the lock so several routers can handshake at once
+        client = gNMIclient(target=(host, port), username=username, password=password,
+                            insecure=True, timeout=self.timeout, grpc_options=list(GRPC_OPTIONS))
+        client.connect()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = {'client': client, 'created_at': now, 'last_used': now}
+                self._clients[key] = entry
+            else:
+                # Another thread connected to the same router first
+                self._close(client)
+            entry['last_used'] = now
+            return entry['client']
+
+    def discard(self, host, port, username, password):
+        """Drops a session that has failed so the next get() reconnects."""
+        with self._lock:
+            entry = self._clients.pop((host, port, username, password), None)
+        if entry:
+            self._close(entry['client'])
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            self._close(entry['client'])
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key, entry in list(self._clients.items()):
+            if (now - entry['last_used'] > self.idle_timeout
+                    or now - entry['created_at'] > self.max_age):
+                del self._clients[key]
+                self._close(entry['client'])
+
+    @staticmethod
+    def _close(client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
 def discover_devices():
     """Discover SR Linux devices based on the specific JSON structure provided."""
+    devices = load_devices()
+    if devices:
+        return devices
+
     try:
-        cmd = "containerlab inspect --format json"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        cmd = ["containerlab", "inspect", "--format", "json"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
         data = json.loads(result.stdout)
         
-        devices = []
-        for lab_nodes in data.values():
-            for node in lab_nodes:
-                if node.get('kind') == 'nokia_srlinux':
-                    devices.append(node['name'])
+        devices = [node['name'] for lab_nodes in data.values() for node in lab_nodes
+                   if node.get('kind') == 'nokia_srlinux']
+        if devices:
+            save_devices(devices)
         return devices
     except Exception as e:
         print(f"Error parsing containerlab output: {e}")
         return []
 
-def get_prefixed_key(data_dict, base_name):
-    """Finds a key in a dict that ends with the base_name."""
+def strip_prefix(key):
+    """Drops a YANG module prefix, e.g. 'srl_nokia-bgp:bgp' -> 'bgp'."""
+    return key.rsplit(':', 1)[-1]
+
+def keys_by_base(data_dict):
+    """Maps each key's unprefixed name to the full key, built once per dict."""
     if not isinstance(data_dict, dict): return {}
-    for key in data_dict.keys():
-        if key == base_name or key.endswith(f":{base_name}"):
-            return data_dict[key]
-    return {}
+    return {strip_prefix(key): key for key in data_dict}
+
+def process_router(pool, router, args, path):
+    """Queries one router and returns (report text, peers, established peers)."""
+    out = io.StringIO()
+    total_peers = 0
+    total_est_peers = 0
+
+    print(f"\n{'*' * 60}\nRouter: {BOLD}{router}{RESET} (Filter: {args.ni})\n{'*' * 60}", file=out)
+
+    try:
+        gc = pool.get(router, args.port, args.u, args.p)
+        result = gc.get(path=path, datatype='state')
+        updates = result.get('notification', [{}])[0].get('update', [])
+
+        for update in updates:
+            val = update.get('val', {})
+            val_keys = keys_by_base(val)
+            raw_ni_data = val[val_keys['network-instance']] if 'network-instance' in val_keys else {}
+            ni_list = raw_ni_data if isinstance(raw_ni_data, list) else [raw_ni_data]
+
+            for ni in ni_list:
+                if not ni and args.ni == '*': continue
+                ni_name = ni.get('name', args.ni)
+                
+                protocols = ni.get('protocols', ni)
+                protocol_keys = keys_by_base(protocols)
+                bgp_container = protocols[protocol_keys['bgp']] if 'bgp' in protocol_keys else {}
+                neighbor_list = bgp_container.get('neighbor', [])
+                
+                if not neighbor_list and 'neighbor' in val:
+                    neighbor_list = val['neighbor']
+
+                if isinstance(neighbor_list, dict):
+                    neighbor_list = [neighbor_list]
+
+                peer_count = 0
+                estab_count = 0
+                for n in neighbor_list:
+                    peer = n.get('peer-address', 'N/A')
+                    state = n.get('session-state', 'N/A')
+                    group = n.get('peer-group', 'N/A')
+                    peer_type = n.get('peer-type', 'N/A')
+                    
+                    peer_count += 1
+                    total_peers += 1
+
+                    # Apply Color Coding
+                    if state.lower() == 'established':
+                        color = GREEN
+                        estab_count += 1
+                        total_est_peers += 1
+                    else:
+                        color = RED
+
+                    print(f"  Instance: {ni_name:<12} | Peer: {peer:<15} | Group: {group:<15} | Type: {peer_type:<10} | State: {color}{state}{RESET}", file=out)
+                
+                # Print instance summary
+                if peer_count > 0:
+                    print(f"  {'-' * 110}", file=out)
+                    print(f"  Instance Summary: {ni_name:<12} | Total: {peer_count} | Up: {GREEN}{estab_count}{RESET}", file=out)
+
+    except Exception as e:
+        print(f"{RED}Error on {router}: {e}{RESET}", file=out)
+        pool.discard(router, args.port, args.u, args.p)
+
+    return out.getvalue(), total_peers, total_est_peers
 
 def main():
     # 1. CLI Setup
@@ -60,70 +217,17 @@ def main():
     path = [f'network-instance[name={args.ni}]/protocols/bgp/neighbor']
     total_peers = 0
     total_est_peers = 0 
+    pool = GNMIPool()
 
-    for router in routers:
-        target_params = {
-            'target': (router, args.port),
-            'username': args.u,
-            'password': args.p,
-            'insecure': True,
-            'timeout': 10
-        }   
+    # Query routers in parallel; each worker buffers its own report so output stays in router order
+    with ThreadPoolExecutor(max_workers=min(32, len(routers))) as ex:
+        results = ex.map(lambda router: process_router(pool, router, args, path), routers)
+        for text, peers, est_peers in results:
+            sys.stdout.write(text)
+            total_peers += peers
+            total_est_peers += est_peers
 
-        print(f"\n{'*' * 60}\nRouter: {BOLD}{router}{RESET} (Filter: {args.ni})\n{'*' * 60}")
-
-        try:
-            with gNMIclient(**target_params) as gc:
-                result = gc.get(path=path, datatype='state')
-                updates = result.get('notification', [{}])[0].get('update', [])
-
-                for update in updates:
-                    val = update.get('val', {})
-                    raw_ni_data = get_prefixed_key(val, 'network-instance')
-                    ni_list = raw_ni_data if isinstance(raw_ni_data, list) else [raw_ni_data]
-
-                    for ni in ni_list:
-                        if not ni and args.ni == '*': continue
-                        ni_name = ni.get('name', args.ni)
-                        
-                        protocols = ni.get('protocols', ni)
-                        bgp_container = get_prefixed_key(protocols, 'bgp')
-                        neighbor_list = bgp_container.get('neighbor', [])
-                        
-                        if not neighbor_list and 'neighbor' in val:
-                            neighbor_list = val['neighbor']
-
-                        if isinstance(neighbor_list, dict):
-                            neighbor_list = [neighbor_list]
-
-                        peer_count = 0
-                        estab_count = 0
-                        for n in neighbor_list:
-                            peer = n.get('peer-address', 'N/A')
-                            state = n.get('session-state', 'N/A')
-                            group = n.get('peer-group', 'N/A')
-                            peer_type = n.get('peer-type', 'N/A')
-                            
-                            peer_count += 1
-                            total_peers += 1
-
-                            # Apply Color Coding
-                            if state.lower() == 'established':
-                                color = GREEN
-                                estab_count += 1
-                                total_est_peers += 1
-                            else:
-                                color = RED
-
-                            print(f"  Instance: {ni_name:<12} | Peer: {peer:<15} | Group: {group:<15} | Type: {peer_type:<10} | State: {color}{state}{RESET}")
-                        
-                        # Print instance summary
-                        if peer_count > 0:
-                            print(f"  {'-' * 110}")
-                            print(f"  Instance Summary: {ni_name:<12} | Total: {peer_count} | Up: {GREEN}{estab_count}{RESET}")
-
-        except Exception as e:
-            print(f"{RED}Error on {router}: {e}{RESET}")
+    pool.close_all()
 
     # Final Fabric Summary
     print(f"\n{BOLD}{'='*60}{RESET}")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# 10.15.26 Short-lived cache of discovered Containerlab devices
+
+import glob
+import json
+import os
+import time
+
+CACHE_FILE = os.path.expanduser("~/.cache/clab_automation/devices.json")
+CACHE_TTL = 300  # seconds
+
+def _topology_key():
+    """Identifies the current topology by the cwd and the mtimes of its clab files."""
+    files = sorted(glob.glob("*.clab.yml") + glob.glob("*.clab.yaml"))
+    return {
+        'cwd': os.getcwd(),
+        'topology_mtimes': {f: os.stat(f).st_mtime for f in files}
+    }
+
+def load_devices():
+    """Returns the cached device list, or None if it is missing, stale or for another topology."""
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+        if time.time() - cache['cached_at'] >= CACHE_TTL:
+            return None
+        key = _topology_key()
+        if cache['cwd'] != key['cwd'] or cache['topology_mtimes'] != key['topology_mtimes']:
+            return None
+        return cache['devices']
+    except Exception:
+        return None
+
+def save_devices(devices):
+    """Writes the device list through to the cache; failures only cost the next run a lookup."""
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        cache = dict(_topology_key(), cached_at=time.time(), devices=devices)
+        with open(CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
@@ -9,15 +9,30 @@ TTL = 64  # Set TTL high enough to traverse your network
 
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
 sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, TTL)
+sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+# Don't loop our own packets back to local listeners, and egress via SRC_IP's interface
+sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 0)
+sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(SRC_IP))
 sock.bind((SRC_IP, 0))
 
 print(f"Sending multicast from {SRC_IP} to {MCAST_GRP}:{MCAST_PORT} with TTL={TTL}")
 
+# Build the payload once and overwrite only the counter and timestamp each send
+PREFIX = b"Packet 000 from client8 at "
+buf = bytearray(PREFIX + b"00:00:00")
+payload = memoryview(buf)
+COUNTER = slice(7, 10)
+STAMP = slice(len(PREFIX), len(buf))
+
+# Pace against a fixed monotonic schedule so send/print time doesn't add drift
+next_send = time.monotonic()
 for i in range(30):
-    message = f"Packet {i:03d} from client8 at {time.strftime('%H:%M:%S')}".encode()
-    sock.sendto(message, (MCAST_GRP, MCAST_PORT))
-    print(f"Sent: {message.decode()}")
-    time.sleep(1)
+    buf[COUNTER] = b"%03d" % i
+    buf[STAMP] = time.strftime('%H:%M:%S').encode()
+    sock.sendto(payload, (MCAST_GRP, MCAST_PORT))
+    print(f"Sent: {buf.decode()}")
+    next_send += 1
+    time.sleep(max(0, next_send - time.monotonic()))
 
 sock.close()
 EOF
\ No newline at end of file